@@ -14,51 +14,181 @@ Input JSON Schema:
         "sample_rate_mode": "single" | "per_file",
         "sample_rate": 48000,
         "sample_rates": {"video1.mp4": 44100, "video2.mov": 48000},
-        "parallel_jobs": 4
+        "parallel_jobs": 4,
+        "encoder_preset": "veryfast",  // libx264 preset, used without VideoToolbox
+        "force_reencode": false,  // re-encode video even when it can be stream-copied
+        "backend": "ffmpeg" | "pyav",  // "pyav" encodes video in-process (pip install av)
+        "emit_results": true  // include per-file results in the complete event
     }
 }
 
-Output: JSON lines (one per event) to stdout
+Output: JSON lines (one per event) to stdout. Events are serialized with
+orjson when it is installed (pip install orjson), otherwise the standard library.
 """
 
 import os
 import sys
 import json
+import queue
+import atexit
+import selectors
+import functools
+import contextlib
 import subprocess
+import threading
+from fractions import Fraction
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import Optional
-from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import NamedTuple, Optional
 
-sys.stdout.reconfigure(line_buffering=True)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+# Serializes event lines written from worker threads
+_emit_lock = threading.Lock()
 
-class EventType(Enum):
+# Set by start_event_writer: encoded event lines are handed to a background
+# thread instead of being written by the emitting thread
+_event_queue: Optional[queue.Queue] = None
+_event_writer: Optional[threading.Thread] = None
+
+# Source audio codecs that can be stream-copied, mapped to the container
+# extension used for the copied output.
+AUDIO_COPY_EXTENSIONS = {
+    "aac": ".m4a",
+    "mp3": ".mp3",
+    "pcm_s16le": ".wav",
+}
+
+# Source video codecs the VideoToolbox decoder handles. Others (VP9, AV1, ...)
+# are decoded in software even when encoding with VideoToolbox.
+HWACCEL_DECODE_CODECS = {"h264", "hevc", "prores"}
+HWACCEL_INPUT_ARGS = ['-hwaccel', 'videotoolbox', '-hwaccel_output_format', 'videotoolbox']
+
+# Leading options shared by every extraction command: overwrite outputs,
+# only errors on stderr, no interactive stats line
+FFMPEG_GLOBAL_ARGS = ('-y', '-loglevel', 'error', '-nostats')
+
+# Concurrent VideoToolbox encode sessions by Apple Silicon tier, matched
+# against the CPU brand string (e.g. "Apple M2 Pro"). Base chips get the default.
+VT_SESSION_LIMITS = (("Ultra", 8), ("Max", 4), ("Pro", 4))
+DEFAULT_VT_SESSIONS = 2
+
+# Source video codecs that can be stream-copied into the .mp4 video output.
+VIDEO_COPY_CODECS = {"h264", "hevc"}
+
+
+class EventType:
+    """Event names, as plain strings so emitting one needs no enum lookup."""
     START = "start"
     PROGRESS = "progress"
     FILE_START = "file_start"
     FILE_COMPLETE = "file_complete"
     FILE_ERROR = "file_error"
+    PROBES_COMPLETE = "probes_complete"
     STREAM_COMPLETE = "stream_complete"
     COMPLETE = "complete"
     ERROR = "error"
 
 
-def emit_event(event_type: EventType, **kwargs):
+class FileSpec(NamedTuple):
+    """Input path with the name parts used for events and output naming."""
+    path: str
+    name: str
+    stem: str
+
+
+def _dumps_line(obj) -> bytes:
+    """Serialize obj to one compact JSON line, newline included."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(obj, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def emit_event(event_type: str, **kwargs):
     """Emit a JSON event to stdout for the Swift app to consume."""
-    event = {"event": event_type.value, **kwargs}
-    print(json.dumps(event), flush=True)
+    line = _dumps_line({"event": event_type, **kwargs})
+    if _event_queue is not None:
+        _event_queue.put(line)
+        return
+    with _emit_lock:
+        sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+
+
+def _write_events(events: queue.Queue):
+    """Writer thread: write queued event lines, flushing once per burst."""
+    out = sys.stdout.buffer
+    while True:
+        line = events.get()
+        while line is not None:
+            out.write(line)
+            try:
+                line = events.get_nowait()
+            except queue.Empty:
+                break
+        out.flush()
+        if line is None:
+            return
+
+
+def start_event_writer():
+    """
+    Route events through a background writer thread so dispatch never waits
+    on a slow stdout reader. Flushed and stopped at exit.
+    """
+    global _event_queue, _event_writer
+    if _event_queue is not None:
+        return
+    _event_queue = queue.Queue()
+    _event_writer = threading.Thread(target=_write_events, args=(_event_queue,), daemon=True)
+    _event_writer.start()
+    atexit.register(stop_event_writer)
 
 
+def stop_event_writer():
+    """Write any queued events and stop the writer thread."""
+    global _event_queue
+    if _event_queue is None:
+        return
+    events, _event_queue = _event_queue, None
+    events.put(None)
+    _event_writer.join()
+
+
+@functools.lru_cache(maxsize=1)
 def check_videotoolbox_support(ffmpeg_path: str = "ffmpeg") -> bool:
     """Check if VideoToolbox hardware acceleration is available."""
     try:
-        result = subprocess.run([ffmpeg_path, '-encoders'], capture_output=True, text=True)
+        result = subprocess.run(
+            [ffmpeg_path, '-hide_banner', '-encoders'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
         return 'h264_videotoolbox' in result.stdout
     except Exception:
         return False
 
 
+@functools.lru_cache(maxsize=1)
+def detect_vt_session_limit() -> int:
+    """Estimate how many VideoToolbox encodes this Mac can run concurrently."""
+    try:
+        result = subprocess.run(
+            ['sysctl', '-n', 'machdep.cpu.brand_string'], capture_output=True, text=True
+        )
+        brand = result.stdout.strip()
+    except Exception:
+        return DEFAULT_VT_SESSIONS
+    
+    for tier, sessions in VT_SESSION_LIMITS:
+        if tier in brand:
+            return sessions
+    return DEFAULT_VT_SESSIONS
+
+
+@functools.lru_cache(maxsize=1)
 def get_ffmpeg_path() -> str:
     """Get the ffmpeg binary path."""
     common_paths = [
@@ -72,23 +202,33 @@ def get_ffmpeg_path() -> str:
     return "ffmpeg"
 
 
+@functools.lru_cache(maxsize=1)
+def get_ffprobe_path(ffmpeg_path: str) -> str:
+    """Get the ffprobe binary that sits next to the given ffmpeg."""
+    directory = os.path.dirname(ffmpeg_path)
+    return os.path.join(directory, "ffprobe") if directory else "ffprobe"
+
+
 def probe_video(video_path: str, ffmpeg_path: str) -> Optional[dict]:
     """Get video metadata using ffprobe."""
-    ffprobe_path = ffmpeg_path.replace("ffmpeg", "ffprobe")
+    ffprobe_path = get_ffprobe_path(ffmpeg_path)
     try:
+        # Only the stream and format fields read below are reported
         cmd = [
-            ffprobe_path, "-v", "quiet", "-print_format", "json",
-            "-show_format", "-show_streams", video_path
+            ffprobe_path, "-v", "error", "-show_entries",
+            "stream=codec_type,codec_name,width,height,avg_frame_rate,bit_rate,"
+            "sample_rate,channels:format=duration,bit_rate",
+            "-of", "json", video_path
         ]
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         probe = json.loads(result.stdout)
         
-        video_stream = next(
-            (s for s in probe['streams'] if s['codec_type'] == 'video'), None
-        )
-        audio_stream = next(
-            (s for s in probe['streams'] if s['codec_type'] == 'audio'), None
-        )
+        # First stream of each type wins
+        streams_by_type = {}
+        for stream in probe['streams']:
+            streams_by_type.setdefault(stream['codec_type'], stream)
+        video_stream = streams_by_type.get('video')
+        audio_stream = streams_by_type.get('audio')
         
         if not video_stream:
             return None
@@ -124,6 +264,7 @@ def probe_video(video_path: str, ffmpeg_path: str) -> Optional[dict]:
             'bit_rate': bit_rate,
             'width': int(video_stream['width']),
             'height': int(video_stream['height']),
+            'duration': float(probe.get('format', {}).get('duration', 0)),
             'codec': video_stream.get('codec_name', 'unknown'),
             'has_audio': audio_stream is not None,
             'audio_info': audio_info
@@ -133,123 +274,382 @@ def probe_video(video_path: str, ffmpeg_path: str) -> Optional[dict]:
         return None
 
 
+def run_ffmpeg(cmd: list, on_progress=None) -> tuple:
+    """
+    Run an ffmpeg command, discarding stdout.
+    
+    When on_progress is given, ffmpeg writes its -progress key=value blocks to
+    stdout instead and on_progress is called with each completed block as a dict.
+    
+    Returns:
+        (returncode, error) where error is the tail of stderr, only decoded
+        when the command failed.
+    """
+    if on_progress is None:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            return 0, ""
+        return result.returncode, result.stderr[-500:].decode('utf-8', errors='replace')
+    
+    cmd = cmd[:1] + ['-progress', 'pipe:1'] + cmd[1:]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    # Wait on both pipes from this thread: progress lines come from stdout,
+    # while stderr is drained so a chatty failure can't fill its pipe and
+    # stall ffmpeg. Only the end of stderr is kept for the error message.
+    stderr_tail = b''
+    partial = b''
+    block = {}
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        selector.register(proc.stderr, selectors.EVENT_READ)
+        while selector.get_map():
+            for ready, _ in selector.select():
+                data = os.read(ready.fd, 65536)
+                if not data:
+                    selector.unregister(ready.fileobj)
+                elif ready.fileobj is proc.stderr:
+                    stderr_tail = (stderr_tail + data)[-500:]
+                else:
+                    *lines, partial = (partial + data).split(b'\n')
+                    for raw in lines:
+                        key, _, value = raw.decode('utf-8', errors='replace').strip().partition('=')
+                        block[key] = value
+                        if key == 'progress':
+                            on_progress(block)
+                            block = {}
+    
+    returncode = proc.wait()
+    proc.stdout.close()
+    proc.stderr.close()
+    if returncode == 0:
+        return 0, ""
+    return returncode, stderr_tail.decode('utf-8', errors='replace')
+
+
+def progress_reporter(file_id: str, stream: str, duration: float):
+    """Build a run_ffmpeg progress callback that emits PROGRESS events for one file."""
+    def report(block: dict):
+        try:
+            out_time_us = int(block.get('out_time_us', 0))
+        except ValueError:
+            return
+        try:
+            speed = float(block.get('speed', '').rstrip('x'))
+        except ValueError:
+            speed = None
+        percent = min(100.0, out_time_us / (duration * 10_000)) if duration else None
+        emit_event(
+            EventType.PROGRESS,
+            file=file_id,
+            stream=stream,
+            percent=round(percent, 1) if percent is not None else None,
+            speed=speed
+        )
+    return report
+
+
+def ffmpeg_input_command(ffmpeg_path: str, video_path: str, input_args: list = ()) -> list:
+    """Build the start of an extraction command, up to and including the input."""
+    return [ffmpeg_path, *FFMPEG_GLOBAL_ARGS, *input_args, '-i', video_path]
+
+
+def output_is_valid(path: str, min_size: int = 1000) -> bool:
+    """Check that an output file exists and is larger than min_size, with one stat call."""
+    try:
+        return os.stat(path).st_size > min_size
+    except OSError:
+        return False
+
+
+def video_input_attempts(encoder: str, source_codec: str) -> list:
+    """
+    Build the ffmpeg input option sets to try for the video stream. Hardware
+    decode is tried first when encoding with VideoToolbox and the source codec
+    supports it, with plain software decode as the retry.
+    """
+    if encoder == 'h264_videotoolbox' and source_codec in HWACCEL_DECODE_CODECS:
+        return [HWACCEL_INPUT_ARGS, []]
+    return [[]]
+
+
+def is_hwaccel_error(stderr: str) -> bool:
+    """Check whether an ffmpeg failure came from hardware decoding."""
+    stderr = stderr.lower()
+    return 'hwaccel' in stderr or 'videotoolbox' in stderr
+
+
+def video_output_args(
+    frame_rate: float,
+    bit_rate: int,
+    encoder: str,
+    preset: str,
+    threads: int,
+    source_codec: str
+) -> list:
+    """
+    Build the ffmpeg output options for the video-only stream. An encoder of
+    'copy' passes the source stream through untouched.
+    """
+    if encoder == 'copy':
+        args = ['-map', '0:v:0', '-c:v', 'copy', '-an']
+        if source_codec == 'hevc':
+            args.extend(['-tag:v', 'hvc1'])  # QuickTime-compatible HEVC tag
+        return args
+    
+    args = [
+        '-map', '0:v:0',
+        '-c:v', encoder,
+        '-r', str(frame_rate),
+        '-b:v', str(bit_rate),
+        '-an',  # No audio
+    ]
+    
+    if encoder == 'libx264':
+        # Cap encoder threads so concurrent jobs don't oversubscribe the CPU
+        args.extend(['-preset', preset, '-threads', str(threads)])
+    
+    return args
+
+
+def audio_output_attempts(
+    output_file: str,
+    sample_rate: int,
+    audio_codec: str,
+    source_sample_rate: int
+) -> list:
+    """
+    Build the (ffmpeg output options, output path) candidates for the audio
+    stream, preferred first.
+    """
+    attempts = []
+    
+    # Pick the extraction up front from the probed codec instead of trying
+    # every pipeline in turn. Copying is only possible when no resampling is needed.
+    copy_extension = AUDIO_COPY_EXTENSIONS.get(audio_codec)
+    if copy_extension and source_sample_rate == sample_rate:
+        copy_output = str(Path(output_file).with_suffix(copy_extension))
+        attempts.append((['-map', '0:a:0', '-vn', '-acodec', 'copy'], copy_output))
+    attempts.append((
+        ['-map', '0:a:0', '-vn', '-acodec', 'pcm_s16le', '-ar', str(sample_rate)],
+        output_file
+    ))
+    
+    return attempts
+
+
 def extract_video_stream(args: tuple) -> dict:
     """Extract video stream (no audio) from a video file."""
-    (video_path, output_file, frame_rate, bit_rate, encoder, ffmpeg_path, file_id) = args
+    (video_path, output_file, frame_rate, bit_rate, encoder, preset, threads,
+     source_codec, duration, ffmpeg_path, file_id) = args
+    
+    on_progress = progress_reporter(file_id, "video", duration)
     
     try:
-        cmd = [
-            ffmpeg_path,
-            '-y',
-            '-i', video_path,
-            '-c:v', encoder,
-            '-r', str(frame_rate),
-            '-b:v', str(bit_rate),
-            '-an',  # No audio
-        ]
-        
-        if encoder == 'libx264':
-            cmd.extend(['-preset', 'medium'])
-        
-        cmd.append(output_file)
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        for input_args in video_input_attempts(encoder, source_codec):
+            cmd = ffmpeg_input_command(ffmpeg_path, video_path, input_args)
+            cmd.extend(video_output_args(frame_rate, bit_rate, encoder, preset, threads, source_codec))
+            cmd.append(output_file)
+            
+            returncode, error = run_ffmpeg(cmd, on_progress)
+            
+            if returncode == 0:
+                return {"success": True, "file_id": file_id, "stream": "video", "output": output_file}
+            if not (input_args and is_hwaccel_error(error)):
+                break
         
-        if result.returncode == 0:
-            return {"success": True, "file_id": file_id, "stream": "video", "output": output_file}
-        else:
-            return {"success": False, "file_id": file_id, "stream": "video", "error": result.stderr[:500]}
+        return {"success": False, "file_id": file_id, "stream": "video", "error": error}
     except Exception as e:
         return {"success": False, "file_id": file_id, "stream": "video", "error": str(e)}
 
 
 def extract_audio_stream(args: tuple) -> dict:
-    """Extract audio stream as WAV from a video file."""
-    (video_path, output_file, sample_rate, ffmpeg_path, file_id) = args
-    
-    # Try multiple extraction methods
-    methods = [
-        # Method 1: Standard PCM
-        [ffmpeg_path, '-y', '-analyzeduration', '100M', '-probesize', '100M',
-         '-i', video_path, '-vn', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), output_file],
-        # Method 2: Float PCM
-        [ffmpeg_path, '-y', '-i', video_path, '-vn', '-acodec', 'pcm_f32le', 
-         '-ar', str(sample_rate), output_file],
-        # Method 3: Format auto-detect
-        [ffmpeg_path, '-y', '-f', 'mp4', '-i', video_path, '-vn', '-f', 'wav', output_file],
-    ]
+    """Extract audio stream from a video file, stream-copying it when the codec allows."""
+    (video_path, output_file, sample_rate, audio_codec, source_sample_rate,
+     duration, ffmpeg_path, file_id) = args
     
-    for cmd in methods:
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode == 0 and os.path.exists(output_file) and os.path.getsize(output_file) > 1000:
-                return {"success": True, "file_id": file_id, "stream": "audio", "output": output_file}
-        except Exception:
-            continue
+    on_progress = progress_reporter(file_id, "audio", duration)
     
-    # All methods failed - try copying raw audio stream
-    raw_output = output_file.replace('.wav', '.aac')
-    try:
-        cmd = [ffmpeg_path, '-y', '-i', video_path, '-vn', '-acodec', 'copy', raw_output]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0 and os.path.exists(raw_output) and os.path.getsize(raw_output) > 1000:
-            return {
-                "success": True, 
-                "file_id": file_id, 
-                "stream": "audio", 
-                "output": raw_output,
-                "warning": "Could not convert to WAV, saved as AAC"
-            }
-    except Exception:
-        pass
+    error = "Audio extraction failed"
+    for output_args, output in audio_output_attempts(output_file, sample_rate, audio_codec, source_sample_rate):
+        try:
+            cmd = ffmpeg_input_command(ffmpeg_path, video_path) + output_args + [output]
+            returncode, stderr = run_ffmpeg(cmd, on_progress)
+            if returncode == 0 and output_is_valid(output):
+                return {"success": True, "file_id": file_id, "stream": "audio", "output": output}
+            error = stderr or error
+        except Exception as e:
+            error = str(e)
     
     return {
         "success": False, 
         "file_id": file_id, 
         "stream": "audio", 
-        "error": "All audio extraction methods failed"
+        "error": error
     }
 
 
-def process_single_file(args: tuple) -> dict:
-    """Process a single video file - extract both video and audio streams."""
-    (video_path, sample_rate, ffmpeg_path, use_videotoolbox) = args
+def extract_video_stream_pyav(args: tuple) -> Optional[dict]:
+    """
+    Encode the video stream in-process with PyAV (libav bindings) instead of
+    launching ffmpeg, so codec setup isn't repeated in a new process per file.
+    Returns None when PyAV isn't installed so the caller can use ffmpeg instead.
+    """
+    (video_path, output_file, frame_rate, bit_rate, encoder, preset, threads, file_id) = args
     
-    file_id = Path(video_path).name
+    try:
+        import av
+    except ImportError:
+        return None
     
-    # Probe video
-    info = probe_video(video_path, ffmpeg_path)
-    if not info:
-        return {"success": False, "file": file_id, "error": "Failed to probe video"}
+    try:
+        with av.open(video_path) as source, av.open(output_file, mode='w') as output:
+            in_stream = source.streams.video[0]
+            rate = in_stream.average_rate or Fraction(frame_rate).limit_denominator(1001)
+            
+            out_stream = output.add_stream(encoder, rate=rate)
+            out_stream.width = in_stream.codec_context.width
+            out_stream.height = in_stream.codec_context.height
+            out_stream.pix_fmt = 'yuv420p'
+            out_stream.bit_rate = bit_rate
+            if encoder == 'libx264':
+                out_stream.options = {'preset': preset}
+                out_stream.codec_context.thread_count = threads
+            
+            for frame in source.decode(in_stream):
+                frame.pts = None  # Let the encoder number frames at the output rate
+                output.mux(out_stream.encode(frame))
+            output.mux(out_stream.encode(None))  # Flush buffered packets
+        
+        return {"success": True, "file_id": file_id, "stream": "video", "output": output_file}
+    except Exception as e:
+        return {"success": False, "file_id": file_id, "stream": "video", "error": str(e)}
+
+
+def extract_streams(args: tuple) -> tuple:
+    """
+    Extract the video and audio streams with a single ffmpeg process, so the
+    input is read and demuxed once. A stream whose output is missing afterwards
+    is retried on its own with extract_video_stream / extract_audio_stream.
+    
+    Returns:
+        (video_result, audio_result)
+    """
+    (video_path, video_output, audio_output, frame_rate, bit_rate, encoder, preset, threads,
+     source_codec, sample_rate, audio_codec, source_sample_rate, duration, ffmpeg_path, file_id) = args
+    
+    on_progress = progress_reporter(file_id, "all", duration)
     
-    # Setup output directory
-    input_dir = os.path.dirname(os.path.abspath(video_path)) or '.'
-    input_name = Path(video_path).stem
-    output_dir = os.path.join(input_dir, f"{input_name}_separated")
+    audio_args, audio_file = audio_output_attempts(
+        audio_output, sample_rate, audio_codec, source_sample_rate
+    )[0]
+    
+    returncode = -1
+    for input_args in video_input_attempts(encoder, source_codec):
+        cmd = ffmpeg_input_command(ffmpeg_path, video_path, input_args)
+        cmd.extend(video_output_args(frame_rate, bit_rate, encoder, preset, threads, source_codec))
+        cmd.append(video_output)
+        cmd.extend(audio_args)
+        cmd.append(audio_file)
+        
+        try:
+            returncode, error = run_ffmpeg(cmd, on_progress)
+        except Exception:
+            break
+        if returncode == 0 or not (input_args and is_hwaccel_error(error)):
+            break
+    
+    if returncode == 0 and output_is_valid(video_output, min_size=0):
+        video_result = {"success": True, "file_id": file_id, "stream": "video", "output": video_output}
+    else:
+        video_result = extract_video_stream((
+            video_path, video_output, frame_rate, bit_rate, encoder, preset, threads,
+            source_codec, duration, ffmpeg_path, file_id
+        ))
+    
+    if returncode == 0 and output_is_valid(audio_file):
+        audio_result = {"success": True, "file_id": file_id, "stream": "audio", "output": audio_file}
+    else:
+        audio_result = extract_audio_stream((
+            video_path, audio_output, sample_rate, audio_codec,
+            source_sample_rate, duration, ffmpeg_path, file_id
+        ))
+    
+    return video_result, audio_result
+
+
+def prepare_output_dir(spec: FileSpec) -> str:
+    """Create the output directory for a file and check that it is writable."""
+    input_dir = os.path.dirname(os.path.abspath(spec.path)) or '.'
+    output_dir = os.path.join(input_dir, f"{spec.stem}_separated")
     os.makedirs(output_dir, exist_ok=True)
+    if not os.access(output_dir, os.W_OK):
+        raise PermissionError(f"Output directory is not writable: {output_dir}")
+    return output_dir
+
+
+def process_single_file(args: tuple) -> dict:
+    """Process a single video file - extract both video and audio streams."""
+    (spec, info, output_dir, sample_rate, ffmpeg_path, encoder, preset, threads,
+     force_reencode, backend, encode_slots) = args
+    
+    video_path = spec.path
+    file_id = spec.name
+    input_name = spec.stem
     
     video_output = os.path.join(output_dir, f"{input_name}_video.mp4")
     audio_output = os.path.join(output_dir, f"{input_name}_audio.wav")
     
-    encoder = 'h264_videotoolbox' if use_videotoolbox else 'libx264'
+    # The video is written at the source frame rate and bit rate, so unless a
+    # re-encode is forced it can be stream-copied when the codec fits in .mp4
+    copy_video = not force_reencode and info['codec'] in VIDEO_COPY_CODECS
+    video_encoder = 'copy' if copy_video else encoder
     
     results = {"file": file_id, "output_dir": output_dir, "video": None, "audio": None}
     
-    # Extract video
-    video_result = extract_video_stream((
-        video_path, video_output, info['frame_rate'], info['bit_rate'], 
-        encoder, ffmpeg_path, file_id
-    ))
-    results["video"] = video_result
+    # Only jobs that encode need one of the limited encoder slots; stream
+    # copies run at the full configured concurrency
+    with contextlib.nullcontext() if copy_video else encode_slots:
+        pyav_result = None
+        if backend == "pyav" and not copy_video:
+            pyav_result = extract_video_stream_pyav((
+                video_path, video_output, info['frame_rate'], info['bit_rate'],
+                encoder, preset, threads, file_id
+            ))
+        
+        if pyav_result is not None:
+            # Video was handled natively; audio still goes through ffmpeg
+            results["video"] = pyav_result
+            if info['has_audio']:
+                audio_info = info['audio_info']
+                results["audio"] = extract_audio_stream((
+                    video_path, audio_output, sample_rate, audio_info['codec'],
+                    audio_info['sample_rate'], info['duration'], ffmpeg_path, file_id
+                ))
+            else:
+                results["audio"] = {"success": True, "skipped": True, "reason": "No audio stream"}
+        elif info['has_audio']:
+            # Extract both streams in one pass
+            audio_info = info['audio_info']
+            results["video"], results["audio"] = extract_streams((
+                video_path, video_output, audio_output, info['frame_rate'], info['bit_rate'],
+                video_encoder, preset, threads, info['codec'], sample_rate,
+                audio_info['codec'], audio_info['sample_rate'], info['duration'], ffmpeg_path, file_id
+            ))
+        else:
+            results["video"] = extract_video_stream((
+                video_path, video_output, info['frame_rate'], info['bit_rate'], 
+                video_encoder, preset, threads, info['codec'], info['duration'], ffmpeg_path, file_id
+            ))
+            results["audio"] = {"success": True, "skipped": True, "reason": "No audio stream"}
     
-    # Extract audio if present
-    if info['has_audio']:
-        audio_result = extract_audio_stream((
-            video_path, audio_output, sample_rate, ffmpeg_path, file_id
-        ))
-        results["audio"] = audio_result
-    else:
-        results["audio"] = {"success": True, "skipped": True, "reason": "No audio stream"}
+    # Fall back to an ffmpeg encode if the stream copy or PyAV encode didn't work
+    if (copy_video or pyav_result is not None) and not results["video"]["success"]:
+        with encode_slots:
+            results["video"] = extract_video_stream((
+                video_path, video_output, info['frame_rate'], info['bit_rate'], 
+                encoder, preset, threads, info['codec'], info['duration'], ffmpeg_path, file_id
+            ))
     
     results["success"] = (
         results["video"]["success"] and 
@@ -270,10 +670,16 @@ def run_batch(config: dict):
             "sample_rate_mode": "single" | "per_file",
             "sample_rate": 48000,
             "sample_rates": {"filename.mp4": 44100, ...},
-            "parallel_jobs": 4
+            "parallel_jobs": 4,
+            "encoder_preset": "veryfast",
+            "force_reencode": false,
+            "backend": "ffmpeg" | "pyav",
+            "emit_results": true
         }
     }
     """
+    start_event_writer()
+    
     files = config.get("files", [])
     settings = config.get("config", {})
     
@@ -281,12 +687,21 @@ def run_batch(config: dict):
     sample_rate = settings.get("sample_rate", 48000)
     sample_rates = settings.get("sample_rates", {})
     parallel_jobs = settings.get("parallel_jobs", 4)
+    encoder_preset = settings.get("encoder_preset", "veryfast")
+    force_reencode = settings.get("force_reencode", False)
+    backend = settings.get("backend", "ffmpeg")
+    emit_results = settings.get("emit_results", True)
+    
+    # Validate files. The stats run on a thread pool so a long queue on a slow
+    # network volume isn't checked one round trip at a time.
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        exists = list(pool.map(os.path.isfile, files))
     
-    # Validate files
     valid_files = []
-    for f in files:
-        if os.path.isfile(f):
-            valid_files.append(f)
+    for f, is_file in zip(files, exists):
+        if is_file:
+            p = Path(f)
+            valid_files.append(FileSpec(f, p.name, p.stem))
         else:
             emit_event(EventType.ERROR, message=f"File not found: {f}")
     
@@ -297,6 +712,18 @@ def run_batch(config: dict):
     # Setup
     ffmpeg_path = get_ffmpeg_path()
     use_videotoolbox = check_videotoolbox_support(ffmpeg_path)
+    encoder = 'h264_videotoolbox' if use_videotoolbox else 'libx264'
+    
+    # More concurrent encodes than the hardware sessions (or, for libx264,
+    # a quarter of the cores) only adds contention. Stream copies don't open
+    # an encoder, so the limit applies to encoding jobs only.
+    cpu_count = os.cpu_count() or 1
+    if use_videotoolbox:
+        encode_jobs = min(parallel_jobs, detect_vt_session_limit())
+    else:
+        encode_jobs = min(parallel_jobs, max(1, cpu_count // 4))
+    encode_slots = threading.Semaphore(encode_jobs)
+    threads_per_job = max(1, cpu_count // encode_jobs)
     
     emit_event(
         EventType.START,
@@ -308,34 +735,78 @@ def run_batch(config: dict):
         ffmpeg_path=ffmpeg_path
     )
     
+    # Per-file results are only kept when they go into the final event;
+    # otherwise the counters are enough
+    results = []
+    processed = 0
+    successful = 0
+    
+    def record(result: dict):
+        """Count a finished file and keep its result if results are emitted."""
+        nonlocal processed, successful
+        processed += 1
+        successful += result["success"]
+        if emit_results:
+            results.append(result)
+    
+    # Probe every file up front so encodes don't wait on ffprobe one by one
+    probes = {}
+    with ThreadPoolExecutor(max_workers=min(16, len(valid_files))) as executor:
+        for spec, info in zip(valid_files, executor.map(
+            lambda spec: probe_video(spec.path, ffmpeg_path), valid_files
+        )):
+            if info:
+                probes[spec] = info
+            else:
+                emit_event(EventType.FILE_ERROR, file=spec.name, error="Failed to probe video")
+                record({"success": False, "file": spec.name, "error": "Failed to probe video"})
+    
+    emit_event(EventType.PROBES_COMPLETE, probed=len(probes), failed=len(valid_files) - len(probes))
+    
+    # Create the output directories of the probed files before any encode
+    # work, so permission problems surface immediately instead of midway
+    # through the batch
+    output_dirs = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(probes)))) as executor:
+        futures = {executor.submit(prepare_output_dir, spec): spec for spec in probes}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                output_dirs[spec] = future.result()
+            except OSError as e:
+                emit_event(EventType.ERROR, message=f"Cannot create output directory for {spec.path}: {e}")
+                record({"success": False, "file": spec.name, "error": str(e)})
+    
+    # Start the largest jobs first so a long file doesn't run alone at the end
+    probed_files = sorted(
+        output_dirs, key=lambda spec: probes[spec]['duration'] * probes[spec]['bit_rate'], reverse=True
+    )
+    
     # Build task list
     tasks = []
-    for video_path in valid_files:
-        filename = Path(video_path).name
-        
+    for spec in probed_files:
         # Determine sample rate for this file
-        if sample_rate_mode == "per_file" and filename in sample_rates:
-            file_sample_rate = sample_rates[filename]
+        if sample_rate_mode == "per_file" and spec.name in sample_rates:
+            file_sample_rate = sample_rates[spec.name]
         else:
             file_sample_rate = sample_rate
         
-        tasks.append((video_path, file_sample_rate, ffmpeg_path, use_videotoolbox))
-    
-    results = []
+        tasks.append((
+            spec, probes[spec], output_dirs[spec], file_sample_rate, ffmpeg_path, encoder,
+            encoder_preset, threads_per_job, force_reencode, backend, encode_slots
+        ))
     
-    # Process files in parallel
-    with ProcessPoolExecutor(max_workers=parallel_jobs) as executor:
+    # Process files in parallel. Workers only wait on ffmpeg subprocesses,
+    # so threads give the same parallelism without forking interpreters.
+    with ThreadPoolExecutor(max_workers=parallel_jobs) as executor:
         futures = {executor.submit(process_single_file, task): task[0] for task in tasks}
         
-        completed = 0
         for future in as_completed(futures):
-            video_path = futures[future]
-            file_id = Path(video_path).name
-            completed += 1
+            file_id = futures[future].name
             
             try:
                 result = future.result()
-                results.append(result)
+                record(result)
                 
                 if result["success"]:
                     emit_event(
@@ -345,7 +816,7 @@ def run_batch(config: dict):
                         output_dir=result["output_dir"],
                         video=result["video"],
                         audio=result["audio"],
-                        progress=f"{completed}/{len(valid_files)}"
+                        progress=f"{processed}/{len(valid_files)}"
                     )
                 else:
                     emit_event(
@@ -357,21 +828,27 @@ def run_batch(config: dict):
                     )
             except Exception as e:
                 emit_event(EventType.FILE_ERROR, file=file_id, error=str(e))
-                results.append({"success": False, "file": file_id, "error": str(e)})
-    
-    # Final summary
-    successful = sum(1 for r in results if r["success"])
-    failed = len(results) - successful
+                record({"success": False, "file": file_id, "error": str(e)})
     
+    # Final summary. The per-file results can be left out of the event for
+    # large batches whose caller already tracked the per-file events.
+    summary = {"results": results} if emit_results else {}
     emit_event(
         EventType.COMPLETE,
         total_files=len(valid_files),
         successful=successful,
-        failed=failed,
-        results=results
+        failed=processed - successful,
+        **summary
     )
 
 
+def parse_json(data: bytes):
+    """Parse a JSON document with orjson when available, else the standard library."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def main():
     """Entry point - read config from stdin or file argument."""
     config = None
@@ -380,8 +857,8 @@ def main():
         if sys.argv[1] == "--config" and len(sys.argv) > 2:
             config_path = sys.argv[2]
             try:
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
+                with open(config_path, 'rb') as f:
+                    config = parse_json(f.read())
             except Exception as e:
                 emit_event(EventType.ERROR, message=f"Failed to read config file: {e}")
                 sys.exit(1)
@@ -392,7 +869,7 @@ def main():
     if config is None:
         try:
             if not sys.stdin.isatty():
-                config = json.load(sys.stdin)
+                config = parse_json(sys.stdin.buffer.read())
             else:
                 emit_event(EventType.ERROR, message="No configuration provided. Use --config <file> or pipe JSON to stdin.")
                 sys.exit(1)
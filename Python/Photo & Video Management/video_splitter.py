@@ -43,12 +43,15 @@ Proceed with these settings? (y/n): y
 import os
 import subprocess
 import math
+import functools
 import ffmpeg
 from pathlib import Path
 
+@functools.lru_cache(maxsize=1)
 def check_videotoolbox_support():
     """
     Check if VideoToolbox hardware acceleration is available.
+    The result is cached so the ffmpeg encoder list is only queried once.
     """
     try:
         result = subprocess.run(['ffmpeg', '-encoders'], capture_output=True, text=True)
@@ -62,22 +65,36 @@ def clean_path(path):
     """
     return path.strip().strip('"\'').strip()
 
+def parse_frame_rate(rate):
+    """
+    Parse an ffprobe frame rate such as '30000/1001' without eval.
+    Returns 0.0 for missing or undefined rates like '0/0'.
+    """
+    num, _, den = rate.partition('/')
+    try:
+        denominator = float(den) if den else 1.0
+        return float(num) / denominator if denominator else 0.0
+    except ValueError:
+        return 0.0
+
 def get_video_info(video_path):
     """
     Get video metadata including frame rate, bit rate, and resolution.
     """
     try:
         probe = ffmpeg.probe(video_path)
-        video_stream = next((stream for stream in probe['streams'] 
-                             if stream['codec_type'] == 'video'), None)
+        # Index streams by type once, first stream of each type wins
+        streams_by_type = {}
+        for stream in probe['streams']:
+            streams_by_type.setdefault(stream['codec_type'], stream)
+        video_stream = streams_by_type.get('video')
         
         if video_stream is None:
             raise Exception("No video stream found")
             
         # Extract frame rate
-        frame_rate = eval(video_stream.get('avg_frame_rate', '0/1'))
-        if frame_rate == 0:
-            frame_rate = eval(video_stream.get('r_frame_rate', '30/1'))
+        frame_rate = (parse_frame_rate(video_stream.get('avg_frame_rate', '0/1'))
+                      or parse_frame_rate(video_stream.get('r_frame_rate', '30/1')))
             
         # Extract resolution
         width = int(video_stream['width'])
@@ -109,45 +126,25 @@ def get_video_info(video_path):
         print(f"Error getting video info: {str(e)}")
         return None
 
-def split_video(video_path, output_dir, segment_duration, video_info):
+def encode_segments(video_path, output_dir, base_name, extension, segment_duration,
+                    video_info, encoder, num_segments):
     """
-    Split video into segments of specified duration, encoding at target fps while preserving other parameters.
-    Uses VideoToolbox acceleration if available.
+    Encode each segment with its own ffmpeg run. Used when the single-pass split fails.
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Get base filename without extension
-    base_name = Path(video_path).stem
-    extension = Path(video_path).suffix
-    
-    # Calculate number of segments
-    total_duration = video_info['duration']
-    num_segments = math.ceil(total_duration / segment_duration)
-    
-    # Check for VideoToolbox support
-    use_videotoolbox = check_videotoolbox_support()
-    encoder = 'h264_videotoolbox' if use_videotoolbox else 'libx264'
-    
-    print(f"\nVideo info:")
-    print(f"  Original frame rate: {video_info['frame_rate']} fps")
-    print(f"  Target frame rate: {video_info['target_fps']} fps")
-    print(f"  Bit rate: {video_info['bit_rate'] / 1_000_000:.2f} Mbps")
-    print(f"  Resolution: {video_info['width']}x{video_info['height']}")
-    print(f"  Duration: {total_duration:.2f} seconds")
-    print(f"  Splitting into {num_segments} segments of {segment_duration:.2f} seconds each")
-    print(f"  Using encoder: {encoder} {'(Hardware accelerated)' if use_videotoolbox else '(Software)'}")
+    # output_dir is already a joined path, so only the part number varies per segment
+    output_prefix = f"{output_dir}{os.sep}{base_name}_part"
     
     for i in range(num_segments):
         start_time = i * segment_duration
-        output_file = os.path.join(output_dir, f"{base_name}_part{i+1:03d}{extension}")
+        output_file = f"{output_prefix}{i+1:03d}{extension}"
         
         try:
             # Form the FFmpeg command with hardware acceleration if available
             cmd = [
                 'ffmpeg',
+                '-y',  # Overwrite anything left by the failed single pass
+                '-ss', str(start_time),  # Input-side seek jumps to the nearest keyframe
                 '-i', video_path,
-                '-ss', str(start_time),
                 '-t', str(segment_duration),
                 '-c:v', encoder,
                 '-r', str(video_info['target_fps']),
@@ -156,13 +153,13 @@ def split_video(video_path, output_dir, segment_duration, video_info):
             ]
             
             # Add encoder-specific options
-            if not use_videotoolbox:
+            if encoder == 'libx264':
                 cmd.extend(['-preset', 'medium'])  # Only for libx264
             
             # Add common options
             cmd.extend([
                 '-c:a', 'copy',
-                '-avoid_negative_ts', '1',
+                '-avoid_negative_ts', 'make_zero',
                 output_file
             ])
             
@@ -172,6 +169,78 @@ def split_video(video_path, output_dir, segment_duration, video_info):
         except subprocess.CalledProcessError as e:
             print(f"Error creating segment {i+1}: {str(e)}")
             continue
+
+def split_video(video_path, output_dir, segment_duration, video_info):
+    """
+    Split video into segments of specified duration with a single ffmpeg pass.
+    When the target fps matches the source the streams are copied and cut at
+    keyframes; otherwise the video is encoded once at the target fps with a
+    keyframe forced at every segment boundary. Uses VideoToolbox acceleration if available.
+    """
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Get base filename without extension
+    video_file = Path(video_path)
+    base_name = video_file.stem
+    extension = video_file.suffix
+    
+    # Calculate number of segments
+    total_duration = video_info['duration']
+    num_segments = math.ceil(total_duration / segment_duration)
+    
+    # Check for VideoToolbox support
+    use_videotoolbox = check_videotoolbox_support()
+    encoder = 'h264_videotoolbox' if use_videotoolbox else 'libx264'
+    
+    # Nothing to re-encode when only the container is being cut
+    copy_streams = abs(video_info['target_fps'] - video_info['frame_rate']) < 0.01
+    
+    print(f"\nVideo info:")
+    print(f"  Original frame rate: {video_info['frame_rate']} fps")
+    print(f"  Target frame rate: {video_info['target_fps']} fps")
+    print(f"  Bit rate: {video_info['bit_rate'] / 1_000_000:.2f} Mbps")
+    print(f"  Resolution: {video_info['width']}x{video_info['height']}")
+    print(f"  Duration: {total_duration:.2f} seconds")
+    print(f"  Splitting into {num_segments} segments of {segment_duration:.2f} seconds each")
+    if copy_streams:
+        print("  Using stream copy (no re-encode, cuts land on the nearest keyframe)")
+    else:
+        print(f"  Using encoder: {encoder} {'(Hardware accelerated)' if use_videotoolbox else '(Software)'}")
+    
+    # The segment muxer expands %-sequences in the whole path, so literal ones are doubled
+    output_pattern = os.path.join(output_dir, f"{base_name}_part").replace('%', '%%') + '%03d' + extension.replace('%', '%%')
+    cmd = ['ffmpeg', '-y', '-i', video_path]
+    
+    if copy_streams:
+        cmd.extend(['-c:v', 'copy'])
+    else:
+        cmd.extend([
+            '-c:v', encoder,
+            '-r', str(video_info['target_fps']),
+            '-b:v', str(video_info['bit_rate']),
+            '-vf', f'scale={video_info["width"]}:{video_info["height"]}',
+            '-force_key_frames', f'expr:gte(t,n_forced*{segment_duration})',
+        ])
+        if not use_videotoolbox:
+            cmd.extend(['-preset', 'medium'])  # Only for libx264
+    
+    cmd.extend([
+        '-c:a', 'copy',
+        '-f', 'segment',
+        '-segment_time', str(segment_duration),
+        '-segment_start_number', '1',
+        '-reset_timestamps', '1',
+        output_pattern
+    ])
+    
+    try:
+        print(f"\nCreating {num_segments} segments in {output_dir}")
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Single-pass split failed ({str(e)}), encoding segments one at a time")
+        encode_segments(video_path, output_dir, base_name, extension, segment_duration,
+                        video_info, encoder, num_segments)
     
     print(f"\nVideo splitting complete. Output files in: {output_dir}")  # end split_video
 
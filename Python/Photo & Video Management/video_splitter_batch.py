@@ -16,56 +16,293 @@ Input JSON Schema:
         "fps_mode": "single" | "per_file",
         "fps_value": 30,  // used if fps_mode is "single"
         "fps_values": {"video1.mp4": 30, "video2.mov": 24},  // used if fps_mode is "per_file"
-        "parallel_jobs": 4
+        "parallel_jobs": 4,
+        "single_pass": false,  // one ffmpeg per file using the segment muxer
+        "emit_results": true,  // include per-file results in the complete event
+        "skip_completed": true,  // skip files whose parts from an identical run are intact
+        "dry_run": false,  // probe and emit a plan event, then stop without splitting
+        "metadata": {  // optional, skips ffprobe for the listed files
+            "video1.mp4": {"duration": 125.5, "width": 1920, "height": 1080,
+                           "bit_rate": 8000000, "frame_rate": 29.97, "codec": "hevc"}
+        }
     }
 }
 
-Output: JSON lines (one per event) to stdout
+Output: JSON lines (one per event) to stdout. Events are serialized with
+orjson when it is installed (pip install orjson), otherwise the standard library.
+Progress comes in two shapes:
+    {"event": "progress", "current_file": 2, "total_files": 5, "filename": "video2.mov"}
+        as each file starts
+    {"event": "segment_progress", "file": "video2.mov", "segment": 3, "total": 8,
+     "percent": 41.5, "speed": 2.3}
+        while ffmpeg works on a segment (segment is null for a single-pass split)
 """
 
 import os
 import sys
 import json
+import atexit
+import selectors
 import subprocess
 import math
+import bisect
 import signal
+import shutil
+import hashlib
+import functools
+import threading
+import multiprocessing
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from dataclasses import dataclass, asdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from typing import Optional
-from enum import Enum
 
-# Ensure unbuffered output for real-time progress
-sys.stdout.reconfigure(line_buffering=True)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialises event lines written from probe threads when no writer is running
+_emit_lock = threading.Lock()
+
+# Set by start_event_writer, and by the pool initializer in worker processes:
+# encoded event lines from every process are handed to the parent's writer
+# thread, which is then the only writer of stdout
+_event_queue = None
+_event_writer: Optional[threading.Thread] = None
+
+# Source codecs the VideoToolbox decoder handles, and the input options that
+# keep decoded frames on GPU surfaces for the VideoToolbox encoder.
+HWACCEL_DECODE_CODECS = {"h264", "hevc", "prores"}
+HWACCEL_INPUT_ARGS = ['-hwaccel', 'videotoolbox', '-hwaccel_output_format', 'videotoolbox']
+
+# Probe results persisted between runs, keyed by "path|mtime_ns|size" so an
+# edited or replaced file is probed again. Least recently used entries are
+# dropped first.
+PROBE_CACHE_PATH = Path.home() / "Library" / "Caches" / "VideoTools" / "probe.json"
+PROBE_CACHE_MAX_ENTRIES = 1024
 
+# Written into a file's output directory after a successful split. It records
+# which input and settings produced the parts, and each part's mtime and size,
+# so a rerun can skip the file while those parts are untouched.
+COMPLETED_RECORD_NAME = ".split_cache.json"
 
-class EventType(Enum):
+
+class EventType:
+    """Event names, as plain strings so emitting one needs no enum lookup."""
     START = "start"
     PROGRESS = "progress"
     FILE_START = "file_start"
     FILE_COMPLETE = "file_complete"
     FILE_ERROR = "file_error"
     SEGMENT_START = "segment_start"
+    SEGMENT_PROGRESS = "segment_progress"
     SEGMENT_COMPLETE = "segment_complete"
+    PLAN = "plan"
     COMPLETE = "complete"
     ERROR = "error"
 
 
-def emit_event(event_type: EventType, **kwargs):
+@dataclass(frozen=True)
+class FileCtx:
+    """Per-file settings shared by all of a file's segment tasks."""
+    file_id: str
+    video_path: str
+    ffmpeg_path: str
+    encoder: str
+    source_codec: str
+    width: int
+    height: int
+    bit_rate: int
+    target_fps: float
+    total_segments: int
+    threads: int
+
+
+@dataclass(frozen=True)
+class SplitSettings:
+    """Batch settings from the "config" block, checked once up front."""
+    split_method: str = "duration"
+    split_value: float = 60
+    fps_mode: str = "single"
+    fps_value: float = 30
+    fps_values: dict = field(default_factory=dict)
+    parallel_jobs: int = 4
+    single_pass: bool = False
+    emit_results: bool = True
+    skip_completed: bool = True
+    dry_run: bool = False
+    metadata: dict = field(default_factory=dict)
+    
+    @classmethod
+    def from_config(cls, settings: dict) -> "SplitSettings":
+        """Build settings from the config dict, raising ValueError on bad values."""
+        result = cls(**{
+            name: settings[name] for name in cls.__dataclass_fields__ if name in settings
+        })
+        
+        if result.split_method not in ("duration", "segments"):
+            raise ValueError(f"unknown split_method {result.split_method!r}")
+        if result.fps_mode not in ("single", "per_file"):
+            raise ValueError(f"unknown fps_mode {result.fps_mode!r}")
+        for name in ("split_value", "fps_value", "parallel_jobs"):
+            if not is_positive_number(getattr(result, name)):
+                raise ValueError(f"{name} must be a positive number")
+        if not isinstance(result.parallel_jobs, int):
+            raise ValueError("parallel_jobs must be a whole number")
+        if not isinstance(result.fps_values, dict) or not isinstance(result.metadata, dict):
+            raise ValueError("fps_values and metadata must be objects")
+        for filename, fps in result.fps_values.items():
+            if not is_positive_number(fps):
+                raise ValueError(f"fps_values[{filename!r}] must be a positive number")
+        return result
+
+
+def is_positive_number(value) -> bool:
+    """Whether a config value is a positive int or float (bools excluded)."""
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and value > 0
+
+
+# File contexts for the current batch, indexed by position. Installed once in
+# each worker by the pool initializer so segment tasks only carry an index.
+_file_contexts: list = []
+
+
+def _set_file_contexts(contexts: list, events=None):
+    """
+    Pool initializer: make the batch's file contexts available to this worker
+    and send its events to the parent's writer.
+    """
+    global _file_contexts, _event_queue
+    _file_contexts = contexts
+    _event_queue = events
+
+
+def _dumps(obj) -> bytes:
+    """Serialize obj to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _dumps_line(obj) -> bytes:
+    """Serialize obj to one compact JSON line, newline included."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(obj, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def emit_event(event_type: str, **kwargs):
     """Emit a JSON event to stdout for the Swift app to consume."""
-    event = {"event": event_type.value, **kwargs}
-    print(json.dumps(event), flush=True)
+    _emit_line(_dumps_line({"event": event_type, **kwargs}))
 
 
-def check_videotoolbox_support(ffmpeg_path: str = "ffmpeg") -> bool:
-    """Check if VideoToolbox hardware acceleration is available."""
+def file_progress_emitter(total_files: int):
+    """
+    Return an emitter for the per-file PROGRESS event of a batch.
+    
+    The constant parts of the line are encoded once, so each call only
+    serializes the counter and the filename.
+    """
+    head = b'{"event":' + _dumps(EventType.PROGRESS) + b',"current_file":'
+    middle = b',"total_files":%d,"filename":' % total_files
+    
+    def emit(current_file: int, filename: str):
+        _emit_line(head + b'%d' % current_file + middle + _dumps(filename) + b'}\n')
+    
+    return emit
+
+
+def _emit_line(line: bytes):
+    """Queue or write one encoded event line."""
+    if _event_queue is not None:
+        _event_queue.put(line)
+        return
+    with _emit_lock:
+        sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+
+
+def _write_events(events):
+    """Writer thread: write queued event lines, flushing once per burst."""
+    out = sys.stdout.buffer
+    while True:
+        line = events.get()
+        while line is not None:
+            out.write(line)
+            if events.empty():
+                break
+            line = events.get()
+        out.flush()
+        if line is None:
+            return
+
+
+def start_event_writer():
+    """
+    Route events through a background writer thread so dispatch never waits
+    on a slow stdout reader. Flushed and stopped at exit.
+    
+    The queue is a pipe that worker processes also write to. A put completes
+    before the worker returns its result, so events keep the order in which
+    they happened, and stdout never sees two writers.
+    """
+    global _event_queue, _event_writer
+    if _event_queue is not None:
+        return
+    _event_queue = multiprocessing.get_context('forkserver').SimpleQueue()
+    _event_writer = threading.Thread(target=_write_events, args=(_event_queue,), daemon=True)
+    _event_writer.start()
+    atexit.register(stop_event_writer)
+
+
+def stop_event_writer():
+    """Write any queued events and stop the writer thread."""
+    global _event_queue
+    if _event_queue is None:
+        return
+    events, _event_queue = _event_queue, None
+    events.put(None)
+    _event_writer.join()
+
+
+@functools.lru_cache(maxsize=1)
+def get_videotoolbox_encoders(ffmpeg_path: str = "ffmpeg") -> frozenset:
+    """Return the VideoToolbox encoders this ffmpeg build provides."""
     try:
-        result = subprocess.run([ffmpeg_path, '-encoders'], capture_output=True, text=True)
-        return 'h264_videotoolbox' in result.stdout
+        result = subprocess.run(
+            [ffmpeg_path, '-hide_banner', '-encoders'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
     except Exception:
-        return False
+        return frozenset()
+    return frozenset(
+        name for name in ('h264_videotoolbox', 'hevc_videotoolbox')
+        if name in result.stdout
+    )
 
 
+def check_videotoolbox_support(ffmpeg_path: str = "ffmpeg") -> bool:
+    """Check if VideoToolbox hardware acceleration is available."""
+    return 'h264_videotoolbox' in get_videotoolbox_encoders(ffmpeg_path)
+
+
+def select_encoder(source_codec: str, vt_encoders: frozenset) -> str:
+    """Pick the VideoToolbox encoder matching the source codec, else libx264."""
+    if source_codec == 'hevc' and 'hevc_videotoolbox' in vt_encoders:
+        return 'hevc_videotoolbox'
+    if 'h264_videotoolbox' in vt_encoders:
+        return 'h264_videotoolbox'
+    return 'libx264'
+
+
+def is_hwaccel_error(stderr: str) -> bool:
+    """Check whether an ffmpeg failure came from hardware decoding."""
+    stderr = stderr.lower()
+    return 'hwaccel' in stderr or 'videotoolbox' in stderr
+
+
+@functools.lru_cache(maxsize=1)
 def get_ffmpeg_path() -> str:
     """Get the ffmpeg binary path."""
     common_paths = [
@@ -79,20 +316,83 @@ def get_ffmpeg_path() -> str:
     return "ffmpeg"
 
 
+@functools.lru_cache(maxsize=1)
+def get_ffprobe_path(ffmpeg_path: str) -> str:
+    """Get the ffprobe binary that sits next to the given ffmpeg."""
+    directory = os.path.dirname(ffmpeg_path)
+    return os.path.join(directory, "ffprobe") if directory else "ffprobe"
+
+
+@functools.lru_cache(maxsize=1)
+def load_probe_cache() -> dict:
+    """Load the persisted probe results, or an empty cache if unavailable."""
+    try:
+        with open(PROBE_CACHE_PATH, 'r') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_probe_cache():
+    """Write the probe cache back to disk, keeping only the most recently used entries."""
+    cache = load_probe_cache()
+    if not cache:
+        return
+    entries = list(cache.items())[-PROBE_CACHE_MAX_ENTRIES:]
+    try:
+        PROBE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = PROBE_CACHE_PATH.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(entries), f)
+        os.replace(tmp_path, PROBE_CACHE_PATH)
+    except OSError:
+        pass  # The cache is only an optimisation
+
+
 def probe_video(video_path: str, ffmpeg_path: str) -> Optional[dict]:
+    """Get video metadata, reusing earlier results for an unchanged file."""
+    video_path = os.path.abspath(video_path)
+    try:
+        st = os.stat(video_path)
+    except OSError as e:
+        emit_event(EventType.ERROR, message=f"Failed to probe {video_path}: {e}")
+        return None
+    return _probe_video_cached(video_path, ffmpeg_path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=PROBE_CACHE_MAX_ENTRIES)
+def _probe_video_cached(video_path: str, ffmpeg_path: str, mtime_ns: int, size: int) -> Optional[dict]:
+    """Look up a probe result in the persisted cache, running ffprobe on a miss."""
+    cache = load_probe_cache()
+    key = f"{video_path}|{mtime_ns}|{size}"
+    info = cache.pop(key, None)
+    if info is not None:
+        # Re-insert so the entry counts as recently used when trimming
+        cache[key] = info
+        return info
+    
+    info = _probe_video_uncached(video_path, ffmpeg_path)
+    if info is not None:
+        cache[key] = info
+    return info
+
+
+def _probe_video_uncached(video_path: str, ffmpeg_path: str) -> Optional[dict]:
     """Get video metadata using ffprobe."""
-    ffprobe_path = ffmpeg_path.replace("ffmpeg", "ffprobe")
+    ffprobe_path = get_ffprobe_path(ffmpeg_path)
     try:
+        # Only the first video stream and the fields read below are reported
         cmd = [
-            ffprobe_path, "-v", "quiet", "-print_format", "json",
-            "-show_format", "-show_streams", video_path
+            ffprobe_path, "-v", "error", "-select_streams", "v:0",
+            "-show_entries",
+            "stream=codec_name,width,height,avg_frame_rate,bit_rate:format=duration,bit_rate",
+            "-of", "json", video_path
         ]
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
         probe = json.loads(result.stdout)
         
-        video_stream = next(
-            (s for s in probe['streams'] if s['codec_type'] == 'video'), None
-        )
+        video_stream = next(iter(probe.get('streams', [])), None)
         if not video_stream:
             return None
         
@@ -126,49 +426,263 @@ def probe_video(video_path: str, ffmpeg_path: str) -> Optional[dict]:
         return None
 
 
+def run_ffmpeg(cmd: list, on_progress=None) -> tuple:
+    """
+    Run an ffmpeg command, discarding stdout.
+    
+    When on_progress is given, ffmpeg writes its -progress key=value blocks to
+    stdout instead and on_progress is called with each completed block as a dict.
+    
+    Returns:
+        (returncode, error) where error is the tail of stderr, only decoded
+        when the command failed.
+    """
+    if on_progress is None:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            return 0, ""
+        return result.returncode, result.stderr[-500:].decode('utf-8', errors='replace')
+    
+    cmd = cmd[:1] + ['-progress', 'pipe:1'] + cmd[1:]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    # Wait on both pipes from this thread: progress lines come from stdout,
+    # while stderr is drained so a chatty failure can't fill its pipe and
+    # stall ffmpeg. Only the end of stderr is kept for the error message.
+    stderr_tail = b''
+    partial = b''
+    block = {}
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        selector.register(proc.stderr, selectors.EVENT_READ)
+        while selector.get_map():
+            for ready, _ in selector.select():
+                data = os.read(ready.fd, 65536)
+                if not data:
+                    selector.unregister(ready.fileobj)
+                elif ready.fileobj is proc.stderr:
+                    stderr_tail = (stderr_tail + data)[-500:]
+                else:
+                    *lines, partial = (partial + data).split(b'\n')
+                    for raw in lines:
+                        key, _, value = raw.decode('utf-8', errors='replace').strip().partition('=')
+                        block[key] = value
+                        if key == 'progress':
+                            on_progress(block)
+                            block = {}
+    
+    returncode = proc.wait()
+    proc.stdout.close()
+    proc.stderr.close()
+    if returncode == 0:
+        return 0, ""
+    return returncode, stderr_tail.decode('utf-8', errors='replace')
+
+
+def progress_reporter(file_id: str, segment_num: int, total_segments: int, duration: float):
+    """Build a run_ffmpeg progress callback that emits SEGMENT_PROGRESS events for one segment."""
+    def report(block: dict):
+        try:
+            out_time_us = int(block.get('out_time_us', 0))
+        except ValueError:
+            return
+        try:
+            speed = float(block.get('speed', '').rstrip('x'))
+        except ValueError:
+            speed = None
+        percent = min(100.0, out_time_us / (duration * 10_000)) if duration else None
+        emit_event(
+            EventType.SEGMENT_PROGRESS,
+            file=file_id,
+            segment=segment_num,
+            total=total_segments,
+            percent=round(percent, 1) if percent is not None else None,
+            speed=speed
+        )
+    return report
+
+
+@functools.lru_cache(maxsize=PROBE_CACHE_MAX_ENTRIES)
+def list_keyframes(video_path: str, ffmpeg_path: str) -> tuple:
+    """
+    List the keyframe timestamps of the first video stream, in seconds.
+    Reads packet flags from the demuxer, so nothing is decoded. Returns an
+    empty tuple if the listing fails.
+    
+    Packet times are absolute, while -ss, -segment_times and the duration
+    count from the start of the file, so the container's start_time (about
+    1.4s in many MPEG-TS files) is subtracted.
+    """
+    cmd = [
+        get_ffprobe_path(ffmpeg_path), "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags:format=start_time", "-of", "csv=p=0", video_path
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ()
+    
+    keyframes = []
+    start_time = 0.0
+    for line in result.stdout.decode('utf-8', errors='replace').splitlines():
+        pts_time, separator, flags = line.partition(',')
+        if not separator:
+            # The format section's single field
+            try:
+                start_time = float(pts_time)
+            except ValueError:
+                pass
+        elif flags.startswith('K') and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+    return tuple(sorted(k - start_time for k in keyframes))
+
+
+def snap_to_keyframes(starts: list, keyframes: tuple, duration: float) -> list:
+    """
+    Move each segment start (after the first) to the nearest keyframe so that
+    stream-copied segments begin exactly where the copy can cut. Starts that
+    land on the same keyframe, or on none before the end, are merged.
+    """
+    if not keyframes:
+        return starts
+    
+    snapped = [starts[0]]
+    for start in starts[1:]:
+        i = bisect.bisect_left(keyframes, start)
+        candidates = keyframes[max(0, i - 1):i + 1]
+        nearest = min(candidates, key=lambda k: abs(k - start))
+        if snapped[-1] < nearest < duration:
+            snapped.append(nearest)
+    return snapped
+
+
+def info_from_metadata(meta: Optional[dict]) -> Optional[dict]:
+    """
+    Build a probe_video-style info dict from metadata supplied in the config.
+    Returns None when the entry is missing or incomplete so the file is probed.
+    """
+    if not meta:
+        return None
+    try:
+        return {
+            'frame_rate': float(meta['frame_rate']),
+            'bit_rate': int(meta['bit_rate']),
+            'width': int(meta['width']),
+            'height': int(meta['height']),
+            'duration': float(meta['duration']),
+            'codec': meta.get('codec', 'unknown')
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def input_attempts(ctx: FileCtx) -> list:
+    """
+    Build the ffmpeg input option sets to try for a file. When encoding with
+    VideoToolbox the media engine decodes too, with plain software decode as
+    the retry if the hardware decoder rejects the input.
+    """
+    if ctx.encoder.endswith('_videotoolbox') and ctx.source_codec in HWACCEL_DECODE_CODECS:
+        return [HWACCEL_INPUT_ARGS, []]
+    return [[]]
+
+
+def command_prefix(ctx: FileCtx) -> list:
+    """Build the global options that start every ffmpeg command for a file."""
+    cmd = [
+        ctx.ffmpeg_path,
+        '-y',  # Overwrite output
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-nostats',
+    ]
+    
+    # Size libx264's encoder and filter threads to this job's share of the
+    # cores. VideoToolbox encodes on the media engine and has no thread option.
+    if ctx.encoder == 'libx264':
+        cmd.extend(['-filter_threads', str(ctx.threads)])
+    return cmd
+
+
+def codec_args(ctx: FileCtx) -> list:
+    """Build the output codec options for a file's segments."""
+    if ctx.encoder == 'copy':
+        return ['-c', 'copy']
+    
+    args = [
+        '-c:v', ctx.encoder,
+        '-r', str(ctx.target_fps),
+        '-b:v', str(ctx.bit_rate),
+    ]
+    
+    # Add encoder-specific options. The scale filter is a software
+    # filter at the source size, so it is left off the VideoToolbox
+    # path where frames stay on GPU surfaces.
+    if ctx.encoder == 'libx264':
+        args.extend([
+            '-vf', f'scale={ctx.width}:{ctx.height}',
+            '-preset', 'medium',
+            '-threads', str(ctx.threads)
+        ])
+    elif ctx.encoder == 'hevc_videotoolbox':
+        args.extend(['-tag:v', 'hvc1'])
+    
+    args.extend(['-c:a', 'copy'])
+    return args
+
+
 def split_single_segment(args: tuple) -> dict:
     """
     Split a single segment from a video. Designed to run in a separate process.
     
     Args tuple contains:
-        (video_path, output_file, start_time, duration, target_fps, bit_rate, 
-         width, height, encoder, ffmpeg_path, segment_num, total_segments)
+        (ctx_index, segment_num, start_time, duration, output_file)
+    where ctx_index selects the FileCtx installed by the pool initializer.
     """
-    (video_path, output_file, start_time, duration, target_fps, bit_rate,
-     width, height, encoder, ffmpeg_path, segment_num, total_segments, file_id) = args
+    ctx_index, segment_num, start_time, duration, output_file = args
+    ctx = _file_contexts[ctx_index]
+    file_id, total_segments = ctx.file_id, ctx.total_segments
+    
+    # ffmpeg's progress blocks carry the bytes written so far; the last one
+    # gives the segment's size without a stat afterwards
+    report = progress_reporter(file_id, segment_num, total_segments, duration)
+    last_block = {}
+    
+    def on_progress(block: dict):
+        report(block)
+        last_block.update(block)
     
     try:
-        cmd = [
-            ffmpeg_path,
-            '-y',  # Overwrite output
-            '-i', video_path,
-            '-ss', str(start_time),
-            '-t', str(duration),
-            '-c:v', encoder,
-            '-r', str(target_fps),
-            '-b:v', str(bit_rate),
-            '-vf', f'scale={width}:{height}',
-        ]
-        
-        # Add encoder-specific options
-        if encoder == 'libx264':
-            cmd.extend(['-preset', 'medium'])
-        
-        cmd.extend([
-            '-c:a', 'copy',
-            '-avoid_negative_ts', '1',
-            output_file
-        ])
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        for input_args in input_attempts(ctx):
+            # -ss before -i seeks through the container index to the nearest
+            # keyframe instead of decoding everything up to the start time
+            cmd = [
+                *command_prefix(ctx),
+                *input_args,
+                '-ss', str(start_time),
+                '-i', ctx.video_path,
+                '-t', str(duration),
+                *codec_args(ctx),
+                '-avoid_negative_ts', 'make_zero',
+                output_file
+            ]
+            
+            returncode, error = run_ffmpeg(cmd, on_progress)
+            if returncode == 0 or not input_args or not is_hwaccel_error(error):
+                break
         
-        if result.returncode == 0:
+        if returncode == 0:
+            try:
+                size = int(last_block['total_size'])
+            except (KeyError, ValueError):
+                size = os.stat(output_file).st_size
             return {
                 "success": True,
                 "file_id": file_id,
                 "segment": segment_num,
                 "total": total_segments,
-                "output": output_file
+                "output": output_file,
+                "size": size
             }
         else:
             return {
@@ -176,7 +690,7 @@ def split_single_segment(args: tuple) -> dict:
                 "file_id": file_id,
                 "segment": segment_num,
                 "total": total_segments,
-                "error": result.stderr[:500]
+                "error": error
             }
     except Exception as e:
         return {
@@ -188,108 +702,331 @@ def split_single_segment(args: tuple) -> dict:
         }
 
 
-def process_video_file(
-    video_path: str,
-    split_method: str,
-    split_value: float,
-    target_fps: float,
-    parallel_jobs: int,
-    ffmpeg_path: str,
-    use_videotoolbox: bool
-) -> dict:
-    """Process a single video file, splitting it into segments."""
+def remove_parts(part_prefix: str, suffix: str):
+    """Delete the numbered parts an earlier run left under part_prefix."""
+    number = 1
+    while True:
+        try:
+            os.remove(part_path(part_prefix, suffix, number))
+        except FileNotFoundError:
+            return
+        number += 1
+
+
+def split_file_single_pass(args: tuple) -> dict:
+    """
+    Split a whole file in one ffmpeg run with the segment muxer, so the source
+    is read (and, when re-encoding, decoded) once. Designed to run in a
+    separate process; SEGMENT_COMPLETE is emitted here as each part is closed.
+    
+    Args tuple contains:
+        (ctx_index, starts, duration, part_prefix, suffix)
+    where starts are the segment start times and parts are named as by
+    part_path, numbered from 1.
+    """
+    ctx_index, starts, duration, part_prefix, suffix = args
+    ctx = _file_contexts[ctx_index]
+    file_id, total_segments = ctx.file_id, ctx.total_segments
     
-    file_id = Path(video_path).name
-    emit_event(EventType.FILE_START, file=file_id, path=video_path)
+    # The segment muxer expands %-sequences in the whole output path, so any
+    # literal % in the directory or file name has to be doubled
+    output_pattern = part_prefix.replace('%', '%%') + '%03d' + suffix.replace('%', '%%')
     
-    # Probe video
-    info = probe_video(video_path, ffmpeg_path)
-    if not info:
-        emit_event(EventType.FILE_ERROR, file=file_id, error="Failed to probe video")
-        return {"success": False, "file": file_id, "error": "Failed to probe video"}
+    # Segments are cut at these times; when re-encoding, keyframes are forced
+    # there so every part starts cleanly
+    cut_times = ','.join(str(t) for t in starts[1:])
+    segment_args = ['-f', 'segment', '-segment_start_number', '1', '-reset_timestamps', '1']
+    if cut_times:
+        segment_args.extend(['-segment_times', cut_times])
+    force_keyframe_args = [] if ctx.encoder == 'copy' or not cut_times else ['-force_key_frames', cut_times]
     
-    # Calculate segment parameters
-    duration = info['duration']
+    outputs = []
+    
+    def emit_closed_segments(final: bool):
+        # The muxer has closed part N once part N+1 exists
+        while len(outputs) < total_segments:
+            output = part_path(part_prefix, suffix, len(outputs) + 1)
+            if not final and not os.path.exists(part_path(part_prefix, suffix, len(outputs) + 2)):
+                break
+            try:
+                size = os.stat(output).st_size
+            except OSError:
+                break
+            outputs.append(output)
+            emit_event(
+                EventType.SEGMENT_COMPLETE,
+                file=file_id,
+                segment=len(outputs),
+                total=total_segments,
+                output=output,
+                size=size
+            )
+    
+    report = progress_reporter(file_id, None, total_segments, duration)
+    
+    def on_progress(block: dict):
+        report(block)
+        emit_closed_segments(final=False)
+    
+    try:
+        for input_args in input_attempts(ctx):
+            # Parts are reported as closed once the next one exists, so parts
+            # left by an earlier run (or a failed attempt) have to go first
+            remove_parts(part_prefix, suffix)
+            del outputs[:]
+            
+            cmd = [
+                *command_prefix(ctx),
+                *input_args,
+                '-i', ctx.video_path,
+                *codec_args(ctx),
+                *force_keyframe_args,
+                *segment_args,
+                output_pattern
+            ]
+            
+            returncode, error = run_ffmpeg(cmd, on_progress)
+            if returncode == 0 or not input_args or not is_hwaccel_error(error):
+                break
+        
+        if returncode == 0:
+            emit_closed_segments(final=True)
+        return {
+            "success": returncode == 0,
+            "file_id": file_id,
+            "outputs": outputs,
+            "error": error if returncode else None
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "file_id": file_id,
+            "outputs": outputs,
+            "error": str(e)
+        }
+
+
+def output_dir_for(video_path: str) -> str:
+    """Directory the parts of video_path are written to."""
+    input_dir = os.path.dirname(os.path.abspath(video_path)) or '.'
+    return os.path.join(input_dir, f"{Path(video_path).stem}_parts")
+
+
+def completed_record_key(video_path: str, split_method: str, split_value: float, target_fps: float) -> Optional[str]:
+    """Key identifying this exact input file and the settings that shape its parts."""
+    try:
+        st = os.stat(video_path)
+    except OSError:
+        return None
+    ident = f"{os.path.abspath(video_path)}|{st.st_mtime_ns}|{st.st_size}|{split_method}|{split_value}|{target_fps}"
+    return hashlib.blake2b(ident.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_completed_outputs(output_dir: str, key: str) -> Optional[list]:
+    """
+    Return the parts recorded for key if every one is still on disk unchanged,
+    otherwise None.
+    """
+    try:
+        with open(os.path.join(output_dir, COMPLETED_RECORD_NAME), 'rb') as f:
+            record = parse_json(f.read())
+        if record.get("key") != key:
+            return None
+        outputs = []
+        for path, mtime_ns, size in record["outputs"]:
+            st = os.stat(path)
+            if st.st_mtime_ns != mtime_ns or st.st_size != size:
+                return None
+            outputs.append(path)
+        return outputs
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def save_completed_outputs(output_dir: str, key: str, outputs: list):
+    """Record a file's finished parts so an identical rerun can skip it."""
+    record_path = os.path.join(output_dir, COMPLETED_RECORD_NAME)
+    tmp_path = record_path + '.tmp'
+    try:
+        entries = []
+        for path in sorted(outputs):
+            st = os.stat(path)
+            entries.append([path, st.st_mtime_ns, st.st_size])
+        with open(tmp_path, 'wb') as f:
+            f.write(_dumps({"key": key, "outputs": entries}))
+        os.replace(tmp_path, record_path)
+    except OSError:
+        pass  # The record is only an optimisation
+
+
+def segment_starts(duration: float, split_method: str, split_value: float) -> list:
+    """Start times of the segments a file of this duration is split into."""
     if split_method == "duration":
         segment_duration = split_value
         num_segments = math.ceil(duration / segment_duration)
     else:  # segments
         num_segments = int(split_value)
         segment_duration = duration / num_segments
+    return [i * segment_duration for i in range(num_segments)]
+
+
+def part_path(part_prefix: str, suffix: str, number: int) -> str:
+    """Path of a numbered part, e.g. /dir/clip_parts/clip_part003.mp4."""
+    return f"{part_prefix}{number:03d}{suffix}"
+
+
+def is_copy_split(target_fps: float, info: dict) -> bool:
+    """Whether segments at target_fps can be stream-copied instead of encoded."""
+    return abs(target_fps - info['frame_rate']) < 0.01
+
+
+def task_duration(worker, task: tuple) -> float:
+    """Seconds of source video a worker task covers."""
+    return task[2] if worker is split_file_single_pass else task[3]
+
+
+def plan_video_file(
+    ctx_index: int,
+    video_path: str,
+    info: dict,
+    split_method: str,
+    split_value: float,
+    target_fps: float,
+    ffmpeg_path: str,
+    vt_encoders: frozenset,
+    threads: int,
+    single_pass: bool = False,
+    keyframes: tuple = ()
+) -> tuple:
+    """
+    Create the output directory for a probed video and build its shared
+    FileCtx plus the worker tasks for its segments: one task per segment, or
+    a single split_file_single_pass task when single_pass is set. keyframes
+    are the source's keyframe times, used to place stream-copy cuts.
+    
+    Returns:
+        (output_dir, ctx, worker, tasks)
+    """
+    path = Path(video_path)
+    file_id = path.name
+    
+    # Calculate segment parameters
+    duration = info['duration']
+    starts = segment_starts(duration, split_method, split_value)
     
     # Setup output directory
-    input_dir = os.path.dirname(os.path.abspath(video_path)) or '.'
-    input_name = Path(video_path).stem
-    extension = Path(video_path).suffix
-    output_dir = os.path.join(input_dir, f"{input_name}_parts")
+    output_dir = output_dir_for(video_path)
     os.makedirs(output_dir, exist_ok=True)
+    part_prefix = os.path.join(output_dir, f"{path.stem}_part")
     
-    encoder = 'h264_videotoolbox' if use_videotoolbox else 'libx264'
+    # Segments at the source frame rate are a pure split: stream copy cuts at
+    # keyframes without decoding or encoding anything
+    if is_copy_split(target_fps, info):
+        encoder = 'copy'
+    else:
+        encoder = select_encoder(info['codec'], vt_encoders)
+    
+    # A copy can only start a segment on a keyframe. Cutting exactly there
+    # keeps neighbouring segments from overlapping up to the previous keyframe.
+    if encoder == 'copy':
+        starts = snap_to_keyframes(starts, keyframes, duration)
+    
+    ctx = FileCtx(
+        file_id=file_id,
+        video_path=video_path,
+        ffmpeg_path=ffmpeg_path,
+        encoder=encoder,
+        source_codec=info['codec'],
+        width=info['width'],
+        height=info['height'],
+        bit_rate=info['bit_rate'],
+        target_fps=target_fps,
+        total_segments=len(starts),
+        threads=threads
+    )
+    
+    if single_pass:
+        return output_dir, ctx, split_file_single_pass, [
+            (ctx_index, tuple(starts), duration, part_prefix, path.suffix)
+        ]
     
     # Build segment tasks
     segment_tasks = []
-    for i in range(num_segments):
-        start_time = i * segment_duration
-        output_file = os.path.join(output_dir, f"{input_name}_part{i+1:03d}{extension}")
-        
+    for i, start_time in enumerate(starts):
+        end_time = starts[i + 1] if i + 1 < len(starts) else duration
         segment_tasks.append((
-            video_path, output_file, start_time, segment_duration, target_fps,
-            info['bit_rate'], info['width'], info['height'], encoder, ffmpeg_path,
-            i + 1, num_segments, file_id
+            ctx_index, i + 1, start_time, end_time - start_time,
+            part_path(part_prefix, path.suffix, i + 1)
         ))
     
-    # Process segments (parallel within this file's allocation)
-    completed = 0
-    errors = []
-    outputs = []
-    
-    # Use at most parallel_jobs workers for this file's segments
-    workers = min(parallel_jobs, len(segment_tasks))
+    return output_dir, ctx, split_single_segment, segment_tasks
+
+
+def finish_video_file(state: dict) -> dict:
+    """Emit the completion event for a file whose segments have all finished."""
+    success = len(state["errors"]) == 0
+    if success and state.get("record_key"):
+        save_completed_outputs(state["output_dir"], state["record_key"], state["outputs"])
     
-    with ProcessPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(split_single_segment, task): task for task in segment_tasks}
-        
-        for future in as_completed(futures):
-            result = future.result()
-            completed += 1
-            
-            if result["success"]:
-                outputs.append(result["output"])
-                emit_event(
-                    EventType.SEGMENT_COMPLETE,
-                    file=file_id,
-                    segment=result["segment"],
-                    total=result["total"],
-                    output=result["output"]
-                )
-            else:
-                errors.append(result["error"])
-                emit_event(
-                    EventType.FILE_ERROR,
-                    file=file_id,
-                    segment=result["segment"],
-                    error=result["error"]
-                )
-    
-    success = len(errors) == 0
     emit_event(
         EventType.FILE_COMPLETE,
-        file=file_id,
+        file=state["file"],
         success=success,
-        segments_completed=len(outputs),
-        segments_total=num_segments,
-        output_dir=output_dir
+        segments_completed=len(state["outputs"]),
+        segments_total=state["total"],
+        output_dir=state["output_dir"],
+        **({"cached": True} if state.get("cached") else {})
     )
     
     return {
         "success": success,
-        "file": file_id,
-        "output_dir": output_dir,
-        "segments": len(outputs),
-        "errors": errors
+        "file": state["file"],
+        "output_dir": state["output_dir"],
+        "segments": len(state["outputs"]),
+        "errors": state["errors"]
     }
 
 
+def emit_plan(valid_files: list, infos: list, settings: SplitSettings, target_fps_for, vt_encoders: frozenset):
+    """Emit the PLAN event for a dry run: what each file would be split into."""
+    files = []
+    total_duration = 0.0
+    total_frames = 0
+    for video_path, (_, done, info, _) in zip(valid_files, infos):
+        filename = os.path.basename(video_path)
+        if done is not None:
+            files.append({"file": filename, "cached": True, "segments": len(done)})
+            continue
+        if not info:
+            files.append({"file": filename, "error": "Failed to probe video"})
+            continue
+        
+        target_fps = target_fps_for(filename)
+        if is_copy_split(target_fps, info):
+            encoder = 'copy'
+        else:
+            encoder = select_encoder(info['codec'], vt_encoders)
+        frames = round(info['duration'] * target_fps)
+        files.append({
+            "file": filename,
+            "duration": info['duration'],
+            "fps": target_fps,
+            "frames": frames,
+            "segments": len(segment_starts(info['duration'], settings.split_method, settings.split_value)),
+            "encoder": encoder
+        })
+        total_duration += info['duration']
+        total_frames += frames
+    
+    emit_event(
+        EventType.PLAN,
+        total_files=len(valid_files),
+        total_duration=round(total_duration, 3),
+        total_frames=total_frames,
+        files=files
+    )
+
+
 def run_batch(config: dict):
     """
     Run batch video splitting based on configuration.
@@ -303,24 +1040,32 @@ def run_batch(config: dict):
             "fps_mode": "single" | "per_file",
             "fps_value": 30,
             "fps_values": {"filename.mp4": 24, ...},
-            "parallel_jobs": 4
+            "parallel_jobs": 4,
+            "single_pass": false,
+            "emit_results": true,
+            "skip_completed": true,
+            "dry_run": false,
+            "metadata": {"filename.mp4": {"duration": 125.5, ...}, ...}
         }
     }
     """
+    start_event_writer()
+    
     files = config.get("files", [])
-    settings = config.get("config", {})
+    try:
+        settings = SplitSettings.from_config(config.get("config", {}))
+    except ValueError as e:
+        emit_event(EventType.ERROR, message=f"Invalid config: {e}")
+        return
     
-    split_method = settings.get("split_method", "duration")
-    split_value = settings.get("split_value", 60)
-    fps_mode = settings.get("fps_mode", "single")
-    fps_value = settings.get("fps_value", 30)
-    fps_values = settings.get("fps_values", {})
-    parallel_jobs = settings.get("parallel_jobs", 4)
+    # Validate files. The stats run on a thread pool so a long queue on a slow
+    # network volume isn't checked one round trip at a time.
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        exists = list(pool.map(os.path.isfile, files))
     
-    # Validate files
     valid_files = []
-    for f in files:
-        if os.path.isfile(f):
+    for f, is_file in zip(files, exists):
+        if is_file:
             valid_files.append(f)
         else:
             emit_event(EventType.ERROR, message=f"File not found: {f}")
@@ -331,63 +1076,258 @@ def run_batch(config: dict):
     
     # Setup
     ffmpeg_path = get_ffmpeg_path()
-    use_videotoolbox = check_videotoolbox_support(ffmpeg_path)
+    if shutil.which(ffmpeg_path) is None or shutil.which(get_ffprobe_path(ffmpeg_path)) is None:
+        emit_event(EventType.ERROR, message="ffmpeg and ffprobe are required but were not found")
+        return
+    vt_encoders = get_videotoolbox_encoders(ffmpeg_path)
+    use_videotoolbox = 'h264_videotoolbox' in vt_encoders
+    threads_per_job = max(1, (os.cpu_count() or 1) // settings.parallel_jobs)
     
     emit_event(
         EventType.START,
         total_files=len(valid_files),
-        split_method=split_method,
-        split_value=split_value,
-        fps_mode=fps_mode,
-        parallel_jobs=parallel_jobs,
+        split_method=settings.split_method,
+        split_value=settings.split_value,
+        fps_mode=settings.fps_mode,
+        parallel_jobs=settings.parallel_jobs,
         hardware_acceleration=use_videotoolbox,
         ffmpeg_path=ffmpeg_path
     )
     
-    results = []
+    def target_fps_for(filename: str) -> float:
+        """Determine FPS for a file."""
+        if settings.fps_mode == "per_file" and filename in settings.fps_values:
+            return settings.fps_values[filename]
+        return settings.fps_value
     
-    # Process files serially (parallelism is within each file's segments)
-    # This prevents I/O thrashing from too many simultaneous reads
-    for i, video_path in enumerate(valid_files):
-        filename = Path(video_path).name
+    def file_info(video_path: str) -> tuple:
+        """
+        Look for intact parts from an identical earlier run, then use
+        caller-supplied metadata when complete, otherwise probe. Files that
+        will be stream-copied also get their keyframes listed here, so those
+        demux passes run in parallel too.
         
-        # Determine FPS for this file
-        if fps_mode == "per_file" and filename in fps_values:
-            target_fps = fps_values[filename]
-        else:
-            target_fps = fps_value
+        Returns:
+            (record_key, completed_outputs, info, keyframes)
+        """
+        filename = os.path.basename(video_path)
+        target_fps = target_fps_for(filename)
+        key = None
+        if settings.skip_completed:
+            key = completed_record_key(
+                video_path, settings.split_method, settings.split_value, target_fps
+            )
+            done = load_completed_outputs(output_dir_for(video_path), key) if key else None
+            if done is not None:
+                return key, done, None, ()
+        info = info_from_metadata(settings.metadata.get(filename))
+        info = info or probe_video(video_path, ffmpeg_path)
+        keyframes = ()
+        if info and not settings.dry_run and is_copy_split(target_fps, info):
+            keyframes = list_keyframes(video_path, ffmpeg_path)
+        return key, None, info, keyframes
+    
+    # Probe every file up front so segments from all files can be queued
+    # together. The persisted cache is loaded once before the threads start.
+    load_probe_cache()
+    with ThreadPoolExecutor(max_workers=min(16, len(valid_files))) as pool:
+        infos = list(pool.map(file_info, valid_files))
+    
+    if settings.dry_run:
+        emit_plan(valid_files, infos, settings, target_fps_for, vt_encoders)
+        save_probe_cache()
+        return
+    
+    # Per-file results are only kept when they go into the final event;
+    # otherwise the counters are enough
+    results = [None] * len(valid_files) if settings.emit_results else None
+    processed = 0
+    successful = 0
+    emit_file_progress = file_progress_emitter(len(valid_files))
+    contexts = []  # FileCtx per planned file, indexed by the tasks
+    planned = []  # (state, worker, tasks) per planned file
+    started = 0
+    
+    def record(index: int, result: dict):
+        """Count a finished file and keep its result if results are emitted."""
+        nonlocal processed, successful
+        processed += 1
+        successful += result["success"]
+        if results is not None:
+            results[index] = result
+    
+    def announce(filename: str, video_path: str):
+        """Emit the per-file PROGRESS and FILE_START events as a file starts."""
+        nonlocal started
+        started += 1
+        emit_file_progress(started, filename)
+        emit_event(EventType.FILE_START, file=filename, path=video_path)
+    
+    for i, (video_path, (record_key, done, info, keyframes)) in enumerate(zip(valid_files, infos)):
+        filename = os.path.basename(video_path)
+        target_fps = target_fps_for(filename)
         
-        emit_event(
-            EventType.PROGRESS,
-            current_file=i + 1,
-            total_files=len(valid_files),
-            filename=filename
-        )
+        # Files that need no worker start (and finish) here; the rest are
+        # announced when their first task goes to the pool
+        if done is not None or not info:
+            announce(filename, video_path)
+        
+        if done is not None:
+            # Parts from an identical earlier run are intact; nothing to redo
+            record(i, finish_video_file({
+                "file": filename,
+                "output_dir": output_dir_for(video_path),
+                "total": len(done),
+                "outputs": done,
+                "errors": [],
+                "cached": True
+            }))
+            continue
         
-        result = process_video_file(
-            video_path=video_path,
-            split_method=split_method,
-            split_value=split_value,
-            target_fps=target_fps,
-            parallel_jobs=parallel_jobs,
-            ffmpeg_path=ffmpeg_path,
-            use_videotoolbox=use_videotoolbox
+        if not info:
+            emit_event(EventType.FILE_ERROR, file=filename, error="Failed to probe video")
+            record(i, {"success": False, "file": filename, "error": "Failed to probe video"})
+            continue
+        
+        try:
+            output_dir, ctx, worker, tasks = plan_video_file(
+                ctx_index=len(contexts),
+                video_path=video_path,
+                info=info,
+                split_method=settings.split_method,
+                split_value=settings.split_value,
+                target_fps=target_fps,
+                ffmpeg_path=ffmpeg_path,
+                vt_encoders=vt_encoders,
+                threads=threads_per_job,
+                single_pass=settings.single_pass,
+                keyframes=keyframes
+            )
+        except OSError as e:
+            error = f"Cannot create output directory: {e}"
+            announce(filename, video_path)
+            emit_event(EventType.FILE_ERROR, file=filename, error=error)
+            record(i, {"success": False, "file": filename, "error": error})
+            continue
+        
+        contexts.append(ctx)
+        state = {
+            "index": i,
+            "file": filename,
+            "path": video_path,
+            "announced": False,
+            "output_dir": output_dir,
+            "total": ctx.total_segments,
+            "remaining": len(tasks),
+            "outputs": [],
+            "errors": [],
+            "record_key": record_key
+        }
+        if tasks:
+            planned.append((state, worker, tasks))
+        else:
+            announce(filename, video_path)
+            record(i, finish_video_file(state))
+    
+    pending = {}  # future -> state of the file the segment belongs to
+    
+    # One worker pool for the whole batch. forkserver children start from a
+    # small server process with the stdlib modules below already imported,
+    # which is cheaper than spawning a fresh interpreter per worker. The file
+    # contexts are sent to each worker once rather than with every segment.
+    mp_context = multiprocessing.get_context('forkserver')
+    mp_context.set_forkserver_preload(['os', 'subprocess'])
+    with ProcessPoolExecutor(
+        max_workers=settings.parallel_jobs,
+        mp_context=mp_context,
+        initializer=_set_file_contexts,
+        initargs=(contexts, _event_queue)
+    ) as executor:
+        # Longest files first, so a long file queued last doesn't run on its
+        # own after every other worker has gone idle. Each file's segments
+        # stay together so files complete one after another.
+        planned.sort(
+            key=lambda job: sum(task_duration(job[1], task) for task in job[2]),
+            reverse=True
         )
-        results.append(result)
+        jobs = ((state, worker, task) for state, worker, tasks in planned for task in tasks)
+        
+        def submit_next():
+            """Hand the next task to the pool, announcing its file on its first task."""
+            job = next(jobs, None)
+            if job is None:
+                return
+            state, worker, task = job
+            if not state["announced"]:
+                state["announced"] = True
+                announce(state["file"], state["path"])
+            pending[executor.submit(worker, task)] = state
+        
+        # Only as many tasks as workers are in flight, so a file is announced
+        # when a worker actually picks it up rather than all at once
+        for _ in range(settings.parallel_jobs):
+            submit_next()
+        
+        # Segments from every file share the pool; each result is matched back
+        # to its file through the future it came from
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                state = pending.pop(future)
+                result = future.result()
+                
+                if "outputs" in result:
+                    # Single-pass run: its segments were reported as they closed
+                    state["outputs"].extend(result["outputs"])
+                    if not result["success"]:
+                        state["errors"].append(result["error"])
+                        emit_event(EventType.FILE_ERROR, file=state["file"], error=result["error"])
+                elif result["success"]:
+                    state["outputs"].append(result["output"])
+                    emit_event(
+                        EventType.SEGMENT_COMPLETE,
+                        file=state["file"],
+                        segment=result["segment"],
+                        total=result["total"],
+                        output=result["output"],
+                        size=result["size"]
+                    )
+                else:
+                    state["errors"].append(result["error"])
+                    emit_event(
+                        EventType.FILE_ERROR,
+                        file=state["file"],
+                        segment=result["segment"],
+                        error=result["error"]
+                    )
+                
+                state["remaining"] -= 1
+                if not state["remaining"]:
+                    record(state["index"], finish_video_file(state))
+                
+                submit_next()
     
-    # Final summary
-    successful = sum(1 for r in results if r["success"])
-    failed = len(results) - successful
+    save_probe_cache()
     
+    # Final summary. The per-file results can be left out of the event for
+    # large batches whose caller already tracked the per-file events.
+    summary = {"results": results} if results is not None else {}
     emit_event(
         EventType.COMPLETE,
         total_files=len(valid_files),
         successful=successful,
-        failed=failed,
-        results=results
+        failed=processed - successful,
+        **summary
     )
 
 
+def parse_json(data: bytes):
+    """Parse a JSON document with orjson when available, else the standard library."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def main():
     """Entry point - read config from stdin or file argument."""
     config = None
@@ -397,8 +1337,8 @@ def main():
         if sys.argv[1] == "--config" and len(sys.argv) > 2:
             config_path = sys.argv[2]
             try:
-                with open(config_path, 'r') as f:
-                    config = json.load(f)
+                with open(config_path, 'rb') as f:
+                    config = parse_json(f.read())
             except Exception as e:
                 emit_event(EventType.ERROR, message=f"Failed to read config file: {e}")
                 sys.exit(1)
@@ -410,7 +1350,7 @@ def main():
     if config is None:
         try:
             if not sys.stdin.isatty():
-                config = json.load(sys.stdin)
+                config = parse_json(sys.stdin.buffer.read())
             else:
                 emit_event(EventType.ERROR, message="No configuration provided. Use --config <file> or pipe JSON to stdin.")
                 sys.exit(1)